@@ -3,13 +3,29 @@
 # License: GNU General Public License version 3, or any later version
 # See top-level LICENSE file for more information
 
+import collections
 import concurrent.futures
+import functools
+import io
 import json
 import logging
-from os import path
+from os import path, scandir
 from pathlib import Path
+import re
 import subprocess
-from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union, cast
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 from xml.etree import ElementTree
 
 import requests
@@ -50,11 +66,9 @@ def init_merkle_node_info(
     The "known" key is always stored as it is always fetched. The "provenance"
     key is stored if the `provenance` parameter is :const:`True`.
     """
-    nodes_info: Dict[str, Optional[str]] = {"known": None}
-    if provenance:
-        nodes_info["provenance"] = None
+    keys: Tuple[str, ...] = ("known", "provenance") if provenance else ("known",)
     for node in source_tree.iter_tree():
-        data[node.swhid()] = nodes_info.copy()
+        data[node.swhid()] = dict.fromkeys(keys)
     return None
 
 
@@ -138,12 +152,17 @@ def _call_whereis(client, swhid: CoreSWHID) -> Optional[QualifiedSWHID]:
 MAX_WHEREARE_BATCH = 100
 
 
-def _call_whereare(client, swhids: List[CoreSWHID]) -> List[Optional[QualifiedSWHID]]:
+def _call_whereare(
+    client, swhids: List[CoreSWHID]
+) -> Iterator[Optional[QualifiedSWHID]]:
     """manually call provenance's `whereare` endpoind
 
     The WebAPIClient will eventually support this natively. At that point this
     function should be remove in favor on calling the associated method on
     WebAPIClient.
+
+    The answers are parsed lazily, in the order of `swhids`; the returned
+    iterator can only be consumed once.
     """
     query = "provenance/whereare/"
     args = [str(s) for s in swhids]
@@ -157,7 +176,7 @@ def _call_whereare(client, swhids: List[CoreSWHID]) -> List[Optional[QualifiedSW
         raise
 
     to_q = QualifiedSWHID.from_string
-    return [to_q(q) if q is not None else q for q in result]
+    return (to_q(q) if q is not None else None for q in result)
 
 
 _IN_MEM_NODE = Union[Directory, Content]
@@ -232,20 +251,21 @@ def add_provenance(
     next_boundary: dict[CoreSWHID, _IN_MEM_NODE] = {}
 
     # search for the initial boundary of "known" set
-    initial_walk_queue: set[_IN_MEM_NODE] = {source_tree}
+    initial_walk_queue: Deque[_IN_MEM_NODE] = collections.deque([source_tree])
     while initial_walk_queue:
-        node = initial_walk_queue.pop()
+        node = initial_walk_queue.popleft()
         if node in seen:
             continue
         seen.add(node)
-        known: Optional[bool] = data[node.swhid()]["known"]
+        swhid = node.swhid()
+        known: Optional[bool] = data[swhid]["known"]
         if known is None or known:
             # We found a "root" for a known set, we should query it.
-            current_boundary[node.swhid()] = node
+            current_boundary[swhid] = node
         elif node.object_type == FromDiskType.DIRECTORY:
             # that node is unknown, no need to query it, but there might be
             # known set of descendant that need provenance queries.
-            initial_walk_queue.update(node.values())
+            initial_walk_queue.extend(node.values())
 
     all_queries.update(current_boundary.values())
     update_progress(len(done_queries), len(all_queries))
@@ -256,13 +276,12 @@ def add_provenance(
             node = current_boundary.pop(swhid)
             done_queries.add(node)
             if qualified_swhid is not None:
-                data[node.swhid()]["provenance"] = qualified_swhid
+                data[swhid]["provenance"] = qualified_swhid
                 if node.object_type == FromDiskType.DIRECTORY:
                     node = cast(Directory, node)
-                    for sub_node in node.iter_tree():
-                        if sub_node in seen:
-                            continue
-                        seen.add(sub_node)
+                    sub_nodes = [n for n in node.iter_tree() if n not in seen]
+                    seen.update(sub_nodes)
+                    for sub_node in sub_nodes:
                         data[sub_node.swhid()]["provenance"] = qualified_swhid
             elif node.object_type == FromDiskType.DIRECTORY:
                 for sub_node in node.values():
@@ -278,10 +297,15 @@ def add_provenance(
 
 def has_dirs(node: Directory) -> bool:
     """Check if the given directory has other directories inside."""
-    for _, sub_node in node.items():
-        if isinstance(sub_node, Directory):
-            return True
-    return False
+    return any(isinstance(sub_node, Directory) for sub_node in node.values())
+
+
+def get_node_path(node) -> bytes:
+    """return the path of a source tree node, which some contents only have
+    under their "data" key"""
+    data = node.data
+    path = data.get("path")
+    return path if path is not None else data["data"]
 
 
 def get_content_from(
@@ -290,17 +314,13 @@ def get_content_from(
     """Get content information from the given directory node."""
     # root in model.from_disk.Directory should be accessed with b""
     directory = source_tree[node_path if node_path != source_tree.data["path"] else b""]
-    node_contents = list(
-        filter(
-            lambda n: n.object_type == "content", map(lambda n: n[1], directory.items())
-        )
-    )
+    node_contents = [n for n in directory.values() if n.object_type == "content"]
     files_data = {}
     for node in node_contents:
-        node_info = nodes_data[node.swhid()]
-        node_info["swhid"] = str(node.swhid())
-        path_name = "path" if "path" in node.data.keys() else "data"
-        files_data[node.data[path_name]] = node_info
+        swhid = node.swhid()
+        node_info = nodes_data[swhid]
+        node_info["swhid"] = str(swhid)
+        files_data[get_node_path(node)] = node_info
 
     return files_data
 
@@ -312,6 +332,10 @@ def _call_vcs(command, cwd: Optional[Path], **cmd_kwargs):
     )
 
 
+# Matches the name of each ignored entry in `git status -z` output
+GIT_IGNORED_RE = re.compile(rb"(?:^|\0)!! ([^\0]+)")
+
+
 def get_git_ignore_patterns(cwd: Optional[Path]):
     try:
         res = _call_vcs(["git", "status", "--ignored", "--no-renames", "-z"], cwd)
@@ -319,21 +343,13 @@ def get_git_ignore_patterns(cwd: Optional[Path]):
         logger.debug("Failed to call out to git [%d]: %s", e.stderr)
         return False, []
 
-    patterns = []
     stdout = res.stdout
     if not stdout:
         # No status output, so no ignored files
         return True, []
-    # The `-z` CLI flag gives us a stable, null byte-separated output
-    lines = stdout.split(b"\0")
-    for line in lines:
-        if not line:
-            continue
-        status, name = line.split(b" ", 1)
-        if status != b"!!":
-            # skip non-ignored files
-            continue
-        patterns.append(name.rstrip(b"/"))
+    # The `-z` CLI flag gives us a stable, null byte-separated output, only
+    # pick the names of the ignored (`!!`) entries.
+    patterns = [m.group(1).rstrip(b"/") for m in GIT_IGNORED_RE.finditer(stdout)]
 
     return True, patterns
 
@@ -355,7 +371,7 @@ def get_hg_ignore_patterns(cwd: Optional[Path]):
         return True, []
 
     # The `-0` CLI flag gives us a stable, null byte-separated output
-    patterns = [line for line in stdout.split(b"\0") if line]
+    patterns = stdout.rstrip(b"\0").split(b"\0")
 
     return True, patterns
 
@@ -373,18 +389,31 @@ def get_svn_ignore_patterns(cwd: Optional[Path]):
         # No status output, so no ignored files
         return True, []
     # We've asked for XML output since it's easily parsable and stable, unlike
-    # the normal Subversion output.
-    root = ElementTree.fromstring(stdout)
-    status = root.find("target")
-    assert status is not None
-    for entry in status:
-        path = entry.attrib["path"]
-        wc_status = entry.find("wc-status")
+    # the normal Subversion output. Parse it incrementally and detach each
+    # entry of the top-level <target> once handled, so the parsed tree does not
+    # keep one element per entry of the working copy.
+    target = None
+    # elements currently open, the document root first
+    open_elements: List[ElementTree.Element] = []
+    for event, element in ElementTree.iterparse(
+        io.BytesIO(stdout), events=("start", "end")
+    ):
+        if event == "start":
+            if target is None and len(open_elements) == 1 and element.tag == "target":
+                target = element
+            open_elements.append(element)
+            continue
+        open_elements.pop()
+        if target is None or not open_elements or open_elements[-1] is not target:
+            continue
+        wc_status = element.find("wc-status")
         assert wc_status is not None
         entry_status = wc_status.attrib["item"]
         if entry_status == "ignored":
             # SVN uses UTF8 for all paths
-            patterns.append(path.encode())
+            patterns.append(element.attrib["path"].encode())
+        target.remove(element)
+    assert target is not None
 
     return True, patterns
 
@@ -400,24 +429,25 @@ VCS_IGNORE_PATTERNS_METHODS: Dict[
 }
 
 
-def vcs_detected(folder_path: Path) -> bool:
+def detect_vcs_folders(cwd: Optional[Path] = None) -> Set[str]:
+    """Return the names of the VCS folders (e.g. ``.git``) found in `cwd`, or in
+    the current working directory, with a single read of the directory."""
+    folder_names = {name for name, _ in VCS_IGNORE_PATTERNS_METHODS.values()}
     try:
-        return folder_path.is_dir()
-    except Exception as e:
-        logger.debug("Got an exception while looking for %s: %s", folder_path, e)
-        return False
+        with scandir(cwd if cwd is not None else ".") as entries:
+            return {e.name for e in entries if e.name in folder_names and e.is_dir()}
+    except OSError as e:
+        logger.debug("Got an exception while looking for VCS folders: %s", e)
+        return set()
 
 
 def get_vcs_ignore_patterns(cwd: Optional[Path] = None) -> List[bytes]:
     """Return a list of all patterns to ignore according to the VCS used for
     the project being scanned, if any."""
     ignore_patterns = []
+    detected = detect_vcs_folders(cwd)
     for vcs, (folder_name, method) in VCS_IGNORE_PATTERNS_METHODS.items():
-        if cwd is not None:
-            folder_path = cwd / folder_name
-        else:
-            folder_path = Path(folder_name)
-        if vcs_detected(folder_path):
+        if folder_name in detected:
             logger.debug("Trying to get ignore patterns from '%s'", vcs)
             success, patterns = method(cwd)
             if success:
@@ -430,9 +460,13 @@ def get_vcs_ignore_patterns(cwd: Optional[Path] = None) -> List[bytes]:
     return ignore_patterns
 
 
+@functools.lru_cache(maxsize=1)
 def get_ignore_patterns_templates() -> Dict[str, Path]:
     """Return a dict where keys are ignore templates names and value a path to the
-    ignore definition file."""
+    ignore definition file.
+
+    The result is cached and shared between callers, which must not modify it.
+    """
     here = Path(path.abspath(path.dirname(__file__)))
     gitignore_path = here / "resources" / "gitignore"
     assert gitignore_path.exists()
@@ -445,8 +479,12 @@ def get_ignore_patterns_templates() -> Dict[str, Path]:
     return templates
 
 
-def parse_ignore_patterns_template(source: Path) -> List[bytes]:
-    """Given a file path to a gitignore template, return an ignore patterns list"""
+@functools.lru_cache(maxsize=128)
+def parse_ignore_patterns_template(source: Path) -> Tuple[bytes, ...]:
+    """Given a file path to a gitignore template, return its ignore patterns
+
+    The result is cached, hence returned as an immutable tuple.
+    """
     patterns: List[bytes] = []
     assert source.exists()
     assert source.is_file()
@@ -456,4 +494,4 @@ def parse_ignore_patterns_template(source: Path) -> List[bytes]:
         pattern = pattern.strip()
         if pattern and pattern.startswith("#") is False:
             patterns.append(pattern.encode())
-    return patterns
+    return tuple(patterns)
@@ -8,16 +8,13 @@ from enum import Enum
 import json
 import os
 import sys
-from typing import Any, Dict, Set
-
-import ndjson
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
 
 from swh.model.from_disk import Directory
 from swh.model.swhids import CoreSWHID, ExtendedSWHID, QualifiedSWHID
 from swh.web.client.client import WebAPIClient
 
-from .dashboard.dashboard import run_app
-from .data import MerkleNodeInfo
+from .data import MerkleNodeInfo, get_node_path
 
 DEFAULT_OUTPUT = "text"
 OUTPUT_MAP = {}
@@ -34,6 +31,29 @@ def colorize(text: str, color: Color):
     return color.value + text + Color.END.value
 
 
+# terminal color of a node in the text output, by (known, object_type)
+_NODE_COLORS = {
+    (False, "content"): Color.RED.value,
+    (False, "directory"): Color.RED.value,
+    (True, "content"): Color.GREEN.value,
+    (True, "directory"): Color.BLUE.value,
+}
+
+
+# tree indentation strings, indexed by depth and extended on demand
+_INDENTS = [""]
+
+
+def _indent(level: int) -> str:
+    """return the indentation used to display a node at depth `level`"""
+    # nodes whose path is stored under "data" may compute a negative level,
+    # which is displayed without indentation
+    level = max(level, 0)
+    while len(_INDENTS) <= level:
+        _INDENTS.append(_INDENTS[-1] + "│   ")
+    return _INDENTS[level]
+
+
 def _register(name):
     """decorator to register an output class under mode `name`"""
 
@@ -69,9 +89,6 @@ class BaseOutput(ABC):
         self.config = config
         self.web_client = web_client
 
-    def get_path_name(self, node):
-        return "path" if "path" in node.data.keys() else "data"
-
     @abstractmethod
     def show(self):
         pass
@@ -81,6 +98,19 @@ class BaseOutput(ABC):
 class SummaryOutput(BaseOutput):
     """display a summary of the scan results"""
 
+    _summary: Optional[Dict[str, Any]] = None
+
+    @property
+    def summary(self) -> Dict[str, Any]:
+        """the result of :meth:`compute_summary`, computed on first access"""
+        if self._summary is None:
+            self._summary = self.compute_summary()
+        return self._summary
+
+    @summary.setter
+    def summary(self, summary: Dict[str, Any]) -> None:
+        self._summary = summary
+
     def compute_summary(self):
         directories_with_known_files = set()
 
@@ -90,40 +120,32 @@ class SummaryOutput(BaseOutput):
         full_known_directories = set()
         partially_known_directories = set()
 
-        contents = set()
-        directories = set()
+        nodes_data = self.nodes_data
 
         for node in self.source_tree.iter_tree():
             if node.object_type == "content":
-                contents.add(node)
+                total_files += 1
+                if nodes_data[node.swhid()]["known"]:
+                    known_files += 1
+                    # every content of the source tree has its directory as
+                    # only parent
+                    directories_with_known_files.add(get_node_path(node.parents[0]))
             elif node.object_type == "directory":
-                directories.add(node)
+                total_directories += 1
+                if nodes_data[node.swhid()]["known"]:
+                    full_known_directories.add(get_node_path(node))
             else:
                 assert False, "unreachable"
 
-        total_files = len(contents)
-        for c in contents:
-            if self.nodes_data[c.swhid()]["known"]:
-                known_files += 1
-                path = c.data[self.get_path_name(c)]
-                dir_name = os.path.dirname(path)
-                directories_with_known_files.add(dir_name)
-
-        for d in directories:
-            if self.nodes_data[d.swhid()]["known"]:
-                path_name = self.get_path_name(d)
-                path = d.data[path_name]
-                full_known_directories.add(path)
-
-        self.compute_partially_known_recursive(
+        self.compute_partially_known(
             directories_with_known_files,
             partially_known_directories,
             full_known_directories,
             self.source_tree,
         )
 
-        total_directories = len(directories)
-        kp = known_files * 100 // total_files
+        # an empty source tree has no file, and no directory besides its root
+        kp = known_files * 100 // total_files if total_files else 0
         fkp = len(full_known_directories) * 100 // total_directories
         pkp = len(partially_known_directories) * 100 // total_directories
 
@@ -138,41 +160,49 @@ class SummaryOutput(BaseOutput):
             "partially_known_directories_percent": pkp,
         }
 
-    def compute_partially_known_recursive(
+    def compute_partially_known(
         self,
         directories_with_known_files: Set[bytes],
         partially_known_directories: Set[bytes],
         full_known_directories: Set[bytes],
         d: Directory,
-    ):
-        """Recursively compute partially known directories."""
-
-        path_name = self.get_path_name(d)
-        path = d.data[path_name]
-        partially_known = False
-
-        if path in full_known_directories:
-            return False
-
-        if path not in full_known_directories and path in directories_with_known_files:
-            partially_known_directories.add(path)
-            partially_known = True
-
-        for entry in d.values():
-            if entry.object_type == "directory":
-                partially_known_child = self.compute_partially_known_recursive(
-                    directories_with_known_files,
-                    partially_known_directories,
-                    full_known_directories,
-                    entry,
+    ) -> bool:
+        """Compute the partially known directories below `d`, and return whether
+        `d` itself is partially known.
+
+        The tree is walked in post-order with an explicit stack, so that deep
+        trees are not limited by the interpreter recursion limit."""
+
+        # whether each visited directory, by path, is partially known
+        partially_known: Dict[bytes, bool] = {}
+        stack = [(d, get_node_path(d), False)]
+        while stack:
+            directory, path, expanded = stack.pop()
+            if not expanded:
+                if path in full_known_directories:
+                    partially_known[path] = False
+                    continue
+                # revisit the directory once all its sub-directories are done
+                stack.append((directory, path, True))
+                stack.extend(
+                    (entry, get_node_path(entry), False)
+                    for entry in directory.values()
+                    if entry.object_type == "directory"
                 )
-                if partially_known_child:
-                    partially_known_directories.add(path)
-                partially_known = partially_known or partially_known_child
-        return partially_known
+                continue
+
+            partially = path in directories_with_known_files or any(
+                partially_known[get_node_path(entry)]
+                for entry in directory.values()
+                if entry.object_type == "directory"
+            )
+            if partially:
+                partially_known_directories.add(path)
+            partially_known[path] = partially
+        return partially_known[get_node_path(d)]
 
     def show(self):
-        summary = self.compute_summary()
+        summary = self.summary
         kp = summary["known_files_percent"]
         fkp = summary["full_known_directories_percent"]
         pkp = summary["partially_known_directories_percent"]
@@ -194,31 +224,43 @@ class TextOutput(BaseOutput):
     note: as soon as the scan target something larger than a toy project, the
     usability of this mode is poor."""
 
+    # number of lines to accumulate before writing them to stdout
+    BUFFERED_LINES = 4096
+
     def show(self) -> None:
-        isatty = sys.stdout.isatty()
+        # whether stdout is a terminal does not change during the output, pick
+        # the matching line formatter once
+        if sys.stdout.isatty():
+            format_node = self._format_colored_node
+        else:
+            format_node = self._format_node
+        root_depth = self.source_tree.data["path"].count(b"/")
+        lines = []
         for node in self.source_tree.iter_tree():
-            self.print_node(node, isatty, self._compute_level(node))
-
-    def _compute_level(self, node: Any):
-        node_path = str(node.data[self.get_path_name(node)]).split("/")
-        source_path = str(self.source_tree.data["path"]).split("/")
-        return len(node_path) - len(source_path)
-
-    def print_node(self, node: Any, isatty: bool, level: int) -> None:
-        rel_path = os.path.basename(node.data[self.get_path_name(node)])
-        rel_path = rel_path.decode()
-        begin = "│   " * level
+            lines.append(format_node(node, self._compute_level(node, root_depth)))
+            if len(lines) >= self.BUFFERED_LINES:
+                sys.stdout.write("".join(lines))
+                lines.clear()
+        sys.stdout.write("".join(lines))
+
+    def _compute_level(self, node: Any, root_depth: int) -> int:
+        """depth of `node` below the source tree, whose path has `root_depth`
+        separators"""
+        return get_node_path(node).count(b"/") - root_depth
+
+    def _format_node(self, node: Any, level: int) -> str:
+        """return the plain line, newline included, displaying `node`"""
+        name = os.path.basename(get_node_path(node)).decode()
         end = "/" if node.object_type == "directory" else ""
+        return f"{_indent(level)}{name}{end}\n"
 
-        if isatty:
-            if not self.nodes_data[node.swhid()]["known"]:
-                rel_path = colorize(rel_path, Color.RED)
-            elif node.object_type == "directory":
-                rel_path = colorize(rel_path, Color.BLUE)
-            elif node.object_type == "content":
-                rel_path = colorize(rel_path, Color.GREEN)
-
-        print(f"{begin}{rel_path}{end}")
+    def _format_colored_node(self, node: Any, level: int) -> str:
+        """return the line displaying `node`, colored by its known status"""
+        name = os.path.basename(get_node_path(node)).decode()
+        end = "/" if node.object_type == "directory" else ""
+        known = bool(self.nodes_data[node.swhid()]["known"])
+        color = _NODE_COLORS[(known, node.object_type)]
+        return f"{_indent(level)}{color}{name}{Color.END.value}{end}\n"
 
 
 class SWHIDEncoder(json.JSONEncoder):
@@ -233,27 +275,42 @@ class SWHIDEncoder(json.JSONEncoder):
 class JsonOutput(BaseOutput):
     """display the scan result in json"""
 
-    def data_as_json(self):
-        json = {}
+    def _iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """yield a (relative path, node information) pair per node of the
+        source tree"""
+        root = self.source_tree.data["path"]
+        # nodes below the root are stored as `os.path.join(root, ...)`, so their
+        # relative path is a plain slice; keep relpath for anything else.
+        prefix = root if root.endswith(b"/") else root + b"/"
+        prefix_len = len(prefix)
         for node in self.source_tree.iter_tree():
-            rel_path = os.path.relpath(
-                node.data[self.get_path_name(node)].decode(),
-                self.source_tree.data["path"].decode(),
-            )
-            json[rel_path] = {"swhid": str(node.swhid())}
-            for k, v in self.nodes_data[node.swhid()].items():
-                json[rel_path][k] = v
-        return json
+            path = get_node_path(node)
+            if path == root:
+                rel_path = "."
+            elif path.startswith(prefix):
+                rel_path = path[prefix_len:].decode()
+            else:
+                rel_path = os.path.relpath(path.decode(), root.decode())
+            swhid = node.swhid()
+            entry = {"swhid": str(swhid)}
+            entry.update(self.nodes_data[swhid])
+            yield rel_path, entry
+
+    def data_as_json(self):
+        return dict(self._iter_records())
 
     def show(self):
-        print(
-            json.dumps(
-                self.data_as_json(),
-                indent=4,
-                sort_keys=True,
-                cls=SWHIDEncoder,
-            )
-        )
+        # write the same document as json.dumps(self.data_as_json(), indent=4,
+        # sort_keys=True), one record at a time instead of as a single string.
+        # The source tree root is always a record, the document is never empty.
+        records = sorted(self._iter_records(), key=lambda record: record[0])
+        encoder = SWHIDEncoder(indent=4, sort_keys=True)
+        separator = "{\n"
+        for rel_path, entry in records:
+            value = encoder.encode(entry).replace("\n", "\n    ")
+            sys.stdout.write(f"{separator}    {json.dumps(rel_path)}: {value}")
+            separator = ",\n"
+        sys.stdout.write("\n}\n")
 
 
 @_register("ndjson")
@@ -261,7 +318,11 @@ class NDJsonTextOutput(JsonOutput):
     """display the scan result in newline-delimited json"""
 
     def show(self):
-        print(ndjson.dumps({k: v} for k, v in self.data_as_json().items()), flush=True)
+        # stream one record per node, never holding the whole result in memory
+        encoder = SWHIDEncoder()
+        for rel_path, entry in self._iter_records():
+            sys.stdout.write(encoder.encode({rel_path: entry}) + "\n")
+        sys.stdout.flush()
 
 
 @_register("interactive")
@@ -269,11 +330,15 @@ class InteractiveDashboardOutput(SummaryOutput):
     """Dashboard to explore the scan results"""
 
     def show(self) -> None:
+        # Flask is only needed by this output, do not pay its import cost for
+        # the other ones.
+        from .dashboard.dashboard import run_app
+
         run_app(
             self.config,
             self.root_path,
             self.source_tree,
             self.nodes_data,
-            self.compute_summary(),
+            self.summary,
             web_client=self.web_client,
         )
@@ -21,7 +21,7 @@ from .data import (
     init_merkle_node_info,
     parse_ignore_patterns_template,
 )
-from .output import get_output_class
+from .output import SummaryOutput, get_output_class
 from .policy import RandomDirSamplingPriority
 
 
@@ -189,12 +189,17 @@ def scan(
         progress_class=progress_class,
     )
 
-    get_output_class(out_fmt)(
+    output = get_output_class(out_fmt)(
         root_path, nodes_data, source_tree, config, web_client
-    ).show()
+    )
+    output.show()
 
     config["debug_http"] = debug_http
     if interactive:
-        get_output_class("interactive")(
+        dashboard = get_output_class("interactive")(
             root_path, nodes_data, source_tree, config, web_client
-        ).show()
+        )
+        if isinstance(output, SummaryOutput):
+            # do not walk the source tree again for the summary just displayed
+            dashboard.summary = output.summary
+        dashboard.show()
@@ -21,6 +21,7 @@ from swh.core import config as core_config_mod
 from swh.scanner import cli
 from swh.scanner import config as scanner_config_mod
 from swh.scanner import scanner
+from swh.scanner.output import SummaryOutput
 from swh.scanner.setup_wizard import MARKER_TEXT
 
 from .data import present_swhids
@@ -486,6 +487,49 @@ def test_scan_api_url_option_success(cli_runner, oidc_fail, m_scanner, scan_path
     assert positional[0]["web-api"]["url"] == API_URL
 
 
+def test_scan_ndjson_output(cli_runner, live_server, datadir, mocker):
+    api_url = url_for("index", _external=True)
+    mocker.patch("swh.scanner.scanner.COMMON_EXCLUDE_PATTERNS", [])
+    vcs_mock = mocker.patch("swh.scanner.scanner.get_vcs_ignore_patterns")
+    vcs_mock.side_effect = [[]]
+
+    res = cli_runner.invoke(
+        cli.scanner,
+        ["scan", "--no-web-ui", "--output-format", "ndjson", datadir, "-u", api_url],
+    )
+    assert res.exit_code == 0
+    records = [json.loads(line) for line in res.stdout.splitlines()]
+
+    # one single-key object per line
+    assert all(len(record) == 1 for record in records)
+    assert {path for record in records for path in record} == {
+        ".",
+        "global.yml",
+        "global2.yml",
+        "sample-folder-policy.tgz",
+        "sample-folder.tgz",
+    }
+
+
+def test_scan_summary_with_web_ui(cli_runner, live_server, datadir, mocker):
+    api_url = url_for("index", _external=True)
+    mocker.patch("swh.scanner.scanner.COMMON_EXCLUDE_PATTERNS", [])
+    vcs_mock = mocker.patch("swh.scanner.scanner.get_vcs_ignore_patterns")
+    vcs_mock.side_effect = [[]]
+    run_app = mocker.patch("swh.scanner.dashboard.dashboard.run_app")
+    compute_summary = mocker.spy(SummaryOutput, "compute_summary")
+
+    res = cli_runner.invoke(
+        cli.scanner,
+        ["scan", "--web-ui", "--output-format", "summary", datadir, "-u", api_url],
+    )
+    assert res.exit_code == 0
+    # the dashboard is given the summary already computed for the terminal
+    assert compute_summary.call_count == 1
+    assert run_app.call_count == 1
+    assert run_app.call_args[0][4] is compute_summary.spy_return
+
+
 def test_ignore_vcs_patterns(cli_runner, live_server, datadir, mocker):
     api_url = url_for("index", _external=True)
     mocker.patch("swh.scanner.scanner.COMMON_EXCLUDE_PATTERNS", [])
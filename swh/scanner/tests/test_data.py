@@ -11,11 +11,13 @@ import pytest
 from pytest_flask.live_server import LiveServer
 
 from swh.model.exceptions import ValidationError
-from swh.model.from_disk import Directory
+from swh.model.from_disk import Content, Directory
 from swh.scanner.data import (
     MerkleNodeInfo,
     add_provenance,
+    detect_vcs_folders,
     get_ignore_patterns_templates,
+    get_node_path,
     get_vcs_ignore_patterns,
     has_dirs,
     init_merkle_node_info,
@@ -81,6 +83,15 @@ def test_has_dirs(source_tree: Directory) -> None:
     assert has_dirs(source_tree)
 
 
+def test_get_node_path(source_tree: Directory) -> None:
+    root = source_tree.data["path"]
+    assert get_node_path(source_tree) == root
+    assert get_node_path(source_tree[b"foo/quotes.md"]) == root + b"/foo/quotes.md"
+    # contents built from memory only know their data
+    content = Content.from_bytes(mode=0o100644, data=b"some data")
+    assert get_node_path(content) == b"some data"
+
+
 @dataclass
 class DummyCommandResult:
     """Acts as a command result, as if we just called to a subprocess."""
@@ -88,16 +99,24 @@ class DummyCommandResult:
     stdout: bytes
 
 
+def test_detect_vcs_folders(tmp_path) -> None:
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".hg").touch()
+    (tmp_path / "src").mkdir()
+    assert detect_vcs_folders(tmp_path) == {".git"}
+    assert detect_vcs_folders(tmp_path / "missing") == set()
+
+
 def test_get_vcs_ignore_patterns_no_vcs(mocker) -> None:
-    mock = mocker.patch("swh.scanner.data.vcs_detected")
-    mock.return_value = False
+    mock = mocker.patch("swh.scanner.data.detect_vcs_folders")
+    mock.return_value = set()
     assert get_vcs_ignore_patterns() == []
-    assert mock.call_count == 3
+    assert mock.call_count == 1
 
 
 def test_get_vcs_ignore_patterns_vcs_error(mocker) -> None:
-    detected_mock = mocker.patch("swh.scanner.data.vcs_detected")
-    detected_mock.return_value = True
+    detected_mock = mocker.patch("swh.scanner.data.detect_vcs_folders")
+    detected_mock.return_value = {".git", ".hg", ".svn"}
     mock = mocker.patch("swh.scanner.data._call_vcs")
     mock.side_effect = [
         subprocess.CalledProcessError(1, "git"),
@@ -105,15 +124,13 @@ def test_get_vcs_ignore_patterns_vcs_error(mocker) -> None:
         subprocess.CalledProcessError(1, "svn"),
     ]
     assert get_vcs_ignore_patterns() == []
-    assert detected_mock.call_count == 3
+    assert detected_mock.call_count == 1
     assert mock.call_count == 3
 
 
 def test_get_vcs_ignore_patterns_git(mocker) -> None:
-    detected_mock = mocker.patch("swh.scanner.data.vcs_detected")
-    detected_mock.side_effect = [
-        True,
-    ]
+    detected_mock = mocker.patch("swh.scanner.data.detect_vcs_folders")
+    detected_mock.return_value = {".git"}
     mock = mocker.patch("swh.scanner.data._call_vcs")
     mock.side_effect = [
         DummyCommandResult(b"M myfile\0!! Some_Folder/\0!! file with spaces"),
@@ -126,29 +143,22 @@ def test_get_vcs_ignore_patterns_git(mocker) -> None:
 
 def test_get_vcs_ignore_patterns_hg(mocker) -> None:
     # Mercurial answers
-    detected_mock = mocker.patch("swh.scanner.data.vcs_detected")
-    detected_mock.side_effect = [
-        False,  # Git
-        True,  # Mercurial
-    ]
+    detected_mock = mocker.patch("swh.scanner.data.detect_vcs_folders")
+    detected_mock.return_value = {".hg"}
     mock = mocker.patch("swh.scanner.data._call_vcs")
     mock.side_effect = [
         DummyCommandResult(b"myfile\0Other_File\0file with spaces"),
     ]
     res = get_vcs_ignore_patterns()
-    assert detected_mock.call_count == 2
+    assert detected_mock.call_count == 1
     assert mock.call_count == 1
     assert res == [b"myfile", b"Other_File", b"file with spaces"]
 
 
 def test_get_vcs_ignore_patterns_svn(mocker) -> None:
     # SVN answers
-    detected_mock = mocker.patch("swh.scanner.data.vcs_detected")
-    detected_mock.side_effect = [
-        False,  # Git
-        False,  # Mercurial
-        True,  # SVN
-    ]
+    detected_mock = mocker.patch("swh.scanner.data.detect_vcs_folders")
+    detected_mock.return_value = {".svn"}
     mock = mocker.patch("swh.scanner.data._call_vcs")
     mock.side_effect = [
         DummyCommandResult(
@@ -197,11 +207,38 @@ props="none">
         ),
     ]
     res = get_vcs_ignore_patterns()
-    assert detected_mock.call_count == 3
+    assert detected_mock.call_count == 1
     assert mock.call_count == 1
     assert res == [b"myfile/with/nested/things", b"Other_File", b"file with spaces"]
 
 
+def test_get_vcs_ignore_patterns_svn_changelist(mocker) -> None:
+    # only the entries of the top-level target are considered
+    detected_mock = mocker.patch("swh.scanner.data.detect_vcs_folders")
+    detected_mock.return_value = {".svn"}
+    mock = mocker.patch("swh.scanner.data._call_vcs")
+    mock.side_effect = [
+        DummyCommandResult(
+            b"""<?xml version="1.0" encoding="UTF-8"?>
+<status>
+<target path=".">
+<entry path="ignored-file">
+<wc-status item="ignored" props="none"></wc-status>
+</entry>
+</target>
+<changelist name="my-changes">
+<entry path="in-changelist">
+<wc-status item="ignored" props="none"></wc-status>
+</entry>
+</changelist>
+</status>
+"""
+        ),
+    ]
+    res = get_vcs_ignore_patterns()
+    assert res == [b"ignored-file"]
+
+
 def test_get_ignore_patterns_templates() -> None:
     templates = get_ignore_patterns_templates()
     assert len(templates) > 0
@@ -218,4 +255,4 @@ def test_parse_ignore_patterns_template(tmp_path) -> None:
     """
     template_path.write_text(content)
     patterns = parse_ignore_patterns_template(template_path)
-    assert patterns == [b"test/", b"*.test"]
+    assert patterns == (b"test/", b"*.test")
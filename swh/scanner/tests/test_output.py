@@ -0,0 +1,157 @@
+# Copyright (C) 2026 The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+import json
+import sys
+
+from swh.model.cli import model_of_dir
+from swh.model.from_disk import Content
+from swh.model.swhids import QualifiedSWHID
+from swh.scanner.data import MerkleNodeInfo, init_merkle_node_info
+from swh.scanner.output import Color, NDJsonTextOutput, SummaryOutput, TextOutput
+from swh.web.client.client import WebAPIClient
+
+
+def test_summary_empty_source_tree(tmp_path) -> None:
+    source_tree = model_of_dir(str(tmp_path).encode())
+    nodes_data = MerkleNodeInfo()
+    init_merkle_node_info(source_tree, nodes_data, provenance=False)
+    nodes_data[source_tree.swhid()]["known"] = False
+
+    client = WebAPIClient("https://archive.softwareheritage.org/api/1/")
+    output = SummaryOutput(str(tmp_path), nodes_data, source_tree, {}, client)
+    summary = output.compute_summary()
+    assert summary["total_files"] == 0
+    assert summary["known_files_percent"] == 0
+    assert summary["total_directories"] == 1
+
+
+def test_summary_partially_known_directories(source_tree) -> None:
+    nodes_data = MerkleNodeInfo()
+    init_merkle_node_info(source_tree, nodes_data, provenance=False)
+    for node_data in nodes_data.values():
+        node_data["known"] = False
+    nodes_data[source_tree[b"foo/quotes.md"].swhid()]["known"] = True
+    nodes_data[source_tree[b"bar/barfoo2"].swhid()]["known"] = True
+
+    root = source_tree.data["path"]
+    client = WebAPIClient("https://archive.softwareheritage.org/api/1/")
+    output = SummaryOutput(root.decode(), nodes_data, source_tree, {}, client)
+    summary = output.compute_summary()
+    assert summary["full_known_directories"] == {root + b"/bar/barfoo2"}
+    assert summary["partially_known_directories"] == {root, root + b"/foo"}
+
+
+def test_summary_computed_once(source_tree, nodes_data, mocker) -> None:
+    client = WebAPIClient("https://archive.softwareheritage.org/api/1/")
+    output = SummaryOutput("", nodes_data, source_tree, {}, client)
+    compute_summary = mocker.spy(output, "compute_summary")
+    assert output.summary is output.summary
+    assert compute_summary.call_count == 1
+
+
+def _text_output(tmp_path) -> TextOutput:
+    """text output of a root/a/b/c.txt tree, with an extra in-memory content in
+    `a` whose path is only known through its "data" """
+    root = tmp_path / "root"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "a" / "b" / "c.txt").write_text("c")
+    source_tree = model_of_dir(str(root).encode())
+    source_tree[b"a"][b"extra"] = Content.from_bytes(mode=0o100644, data=b"extra")
+
+    nodes_data = MerkleNodeInfo()
+    init_merkle_node_info(source_tree, nodes_data, provenance=False)
+    for node, known in [
+        (source_tree, False),
+        (source_tree[b"a"], True),
+        (source_tree[b"a/b"], False),
+        (source_tree[b"a/b/c.txt"], True),
+        (source_tree[b"a/extra"], True),
+    ]:
+        nodes_data[node.swhid()]["known"] = known
+
+    client = WebAPIClient("https://archive.softwareheritage.org/api/1/")
+    return TextOutput(str(root), nodes_data, source_tree, {}, client)
+
+
+def test_text_output(tmp_path, capsys, mocker) -> None:
+    output = _text_output(tmp_path)
+    mocker.patch.object(sys.stdout, "isatty", return_value=False)
+    output.show()
+    assert capsys.readouterr().out.splitlines() == [
+        "root/",
+        "│   a/",
+        "│   │   b/",
+        "│   │   │   c.txt",
+        # the "data" fallback has no directory, it is displayed unindented
+        "extra",
+    ]
+
+
+def test_text_output_colored(tmp_path, capsys, mocker) -> None:
+    output = _text_output(tmp_path)
+    mocker.patch.object(sys.stdout, "isatty", return_value=True)
+    output.show()
+    red, green, blue, end = (
+        Color.RED.value,
+        Color.GREEN.value,
+        Color.BLUE.value,
+        Color.END.value,
+    )
+    assert capsys.readouterr().out.splitlines() == [
+        f"{red}root{end}/",
+        f"│   {blue}a{end}/",
+        f"│   │   {red}b{end}/",
+        f"│   │   │   {green}c.txt{end}",
+        f"{green}extra{end}",
+    ]
+
+
+def test_text_output_buffered_lines(tmp_path, capsys, mocker) -> None:
+    output = _text_output(tmp_path)
+    output.show()
+    expected = capsys.readouterr().out
+
+    mocker.patch.object(TextOutput, "BUFFERED_LINES", 2)
+    write = mocker.spy(sys.stdout, "write")
+    output.show()
+    assert capsys.readouterr().out == expected
+    # 5 lines: two full batches, then the remaining line
+    assert [args[0].count("\n") for args, _ in write.call_args_list] == [2, 2, 1]
+
+
+def test_ndjson_output_provenance(tmp_path, capsys) -> None:
+    (tmp_path / "file.txt").write_text("content")
+    source_tree = model_of_dir(str(tmp_path).encode())
+    nodes_data = MerkleNodeInfo()
+    init_merkle_node_info(source_tree, nodes_data, provenance=True)
+    provenance = QualifiedSWHID.from_string(
+        "swh:1:cnt:68769579c3eaadbe555379b9c3538e6628bae1eb"
+        ";origin=https://github.com/babar/celeste.git"
+    )
+    for node_data in nodes_data.values():
+        node_data["known"] = True
+        node_data["provenance"] = provenance
+
+    client = WebAPIClient("https://archive.softwareheritage.org/api/1/")
+    output = NDJsonTextOutput(str(tmp_path), nodes_data, source_tree, {}, client)
+    output.show()
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert records == [
+        {
+            ".": {
+                "swhid": str(source_tree.swhid()),
+                "known": True,
+                "provenance": str(provenance),
+            }
+        },
+        {
+            "file.txt": {
+                "swhid": str(source_tree[b"file.txt"].swhid()),
+                "known": True,
+                "provenance": str(provenance),
+            }
+        },
+    ]